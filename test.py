@@ -1,20 +1,88 @@
+import json
+import os
+import time
+
+import pytest
+
 import twspace_dl
+from twspace_dl import twspace
 
 
 # https://gist.github.com/dbr/256270
 def test_filename():
-    assert twspace_dl.FormatInfo.sterilize_fn("test.avi") == "test.avi"
-    assert twspace_dl.FormatInfo.sterilize_fn("Test File.avi") == "Test File.avi"
-    assert twspace_dl.FormatInfo.sterilize_fn("Test") == "Test"
+    assert twspace_dl.Twspace.sterilize_fn("test.avi") == "test.avi"
+    assert twspace_dl.Twspace.sterilize_fn("Test File.avi") == "Test File.avi"
+    assert twspace_dl.Twspace.sterilize_fn("Test") == "Test"
+
+    assert twspace_dl.Twspace.sterilize_fn("Test/File.avi") == "Test_File.avi"
+    assert twspace_dl.Twspace.sterilize_fn("Test/File") == "Test_File"
+
+    assert twspace_dl.Twspace.sterilize_fn("Test/File.avi") == "Test_File.avi"
+    assert twspace_dl.Twspace.sterilize_fn('\\/:*?<Evil>|"') == "______Evil___"
+    assert twspace_dl.Twspace.sterilize_fn("COM2.txt") == "_COM2.txt"
+    assert twspace_dl.Twspace.sterilize_fn("COM2") == "_COM2"
+
+    assert twspace_dl.Twspace.sterilize_fn(".") == "_."
+    assert twspace_dl.Twspace.sterilize_fn("..") == "_.."
+    assert twspace_dl.Twspace.sterilize_fn("...") == "_..."
+
+
+def test_localize_playlist():
+    chunk_url = "https://prod-fastly.video.pscp.tv/audio-space/chunk_1656_0_a.aac"
+    for newline in ("\n", "\r\n"):
+        playlist_text = newline.join(
+            [
+                "#EXTM3U",
+                "#EXT-X-TARGETDURATION:3",
+                "#EXTINF:3.000,",
+                chunk_url,
+                "#EXTINF:3.000,",
+                chunk_url.replace("_0_", "_1_"),
+                "#EXT-X-ENDLIST",
+            ]
+        )
+        chunk_urls, chunk_fns, local_text = twspace_dl.TwspaceDL.localize_playlist(
+            playlist_text
+        )
+        assert chunk_urls == [chunk_url, chunk_url.replace("_0_", "_1_")]
+        assert chunk_fns == ["seg_00000.aac", "seg_00001.aac"]
+        assert local_text == newline.join(
+            [
+                "#EXTM3U",
+                "#EXT-X-TARGETDURATION:3",
+                "#EXTINF:3.000,",
+                "seg_00000.aac",
+                "#EXTINF:3.000,",
+                "seg_00001.aac",
+                "#EXT-X-ENDLIST",
+            ]
+        )
+    with pytest.raises(RuntimeError):
+        twspace_dl.TwspaceDL.localize_playlist("#EXTM3U\n#EXT-X-ENDLIST\n")
+
+
+def _space_metadata(state):
+    return {"data": {"audioSpace": {"metadata": {"state": state}}}}
+
+
+def test_metadata_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(twspace, "METADATA_CACHE_DIR", str(tmp_path))
+    cache_fn = tmp_path / "1OdKrBnaEPXKX.json"
+
+    twspace.Twspace._cache_metadata("1OdKrBnaEPXKX", _space_metadata("Running"))
+    assert not cache_fn.exists()
+    assert twspace.Twspace._cached_metadata("1OdKrBnaEPXKX") is None
 
-    assert twspace_dl.FormatInfo.sterilize_fn("Test/File.avi") == "Test_File.avi"
-    assert twspace_dl.FormatInfo.sterilize_fn("Test/File") == "Test_File"
+    metadata = _space_metadata("Ended")
+    twspace.Twspace._cache_metadata("1OdKrBnaEPXKX", metadata)
+    assert json.loads(cache_fn.read_text()) == metadata
+    assert twspace.Twspace._cached_metadata("1OdKrBnaEPXKX") == metadata
 
-    assert twspace_dl.FormatInfo.sterilize_fn("Test/File.avi") == "Test_File.avi"
-    assert twspace_dl.FormatInfo.sterilize_fn('\\/:*?<Evil>|"') == "______Evil___"
-    assert twspace_dl.FormatInfo.sterilize_fn("COM2.txt") == "_COM2.txt"
-    assert twspace_dl.FormatInfo.sterilize_fn("COM2") == "_COM2"
+    expired = time.time() - twspace.METADATA_CACHE_EXPIRE - 1
+    os.utime(cache_fn, (expired, expired))
+    assert twspace.Twspace._cached_metadata("1OdKrBnaEPXKX") is None
+    assert not cache_fn.exists()
 
-    assert twspace_dl.FormatInfo.sterilize_fn(".") == "_."
-    assert twspace_dl.FormatInfo.sterilize_fn("..") == "_.."
-    assert twspace_dl.FormatInfo.sterilize_fn("...") == "_..."
+    cache_fn.write_text("{not json")
+    assert twspace.Twspace._cached_metadata("1OdKrBnaEPXKX") is None
+    assert not cache_fn.exists()
@@ -1,7 +1,6 @@
 """Script designed to help download twitter spaces"""
 import argparse
 import datetime
-import json
 import logging
 import sys
 from types import TracebackType
@@ -10,7 +9,7 @@ from typing import Optional, Type
 from twspace_dl.api import API
 from twspace_dl.cookies import load_cookies
 from twspace_dl.twspace import Twspace
-from twspace_dl.twspace_dl import TwspaceDL
+from twspace_dl.twspace_dl import DEFAULT_THREADS, TwspaceDL
 
 EXIT_CODE_SUCCESS = 0
 EXIT_CODE_ERROR = 1
@@ -27,6 +26,17 @@ def exception_hook(
     print(f"\033[31;1;4mError\033[0m: {exc_value}\nRetry with -v to see more details")
 
 
+def positive_int(value: str) -> int:
+    """Argument type for options that only accept a positive integer"""
+    try:
+        number = int(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from err
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value!r}")
+    return number
+
+
 def space(args: argparse.Namespace) -> int:
     """Manage the twitter space related function"""
     has_input = (
@@ -83,7 +93,7 @@ def space(args: argparse.Namespace) -> int:
             )
         )
         twspace = Twspace({})
-    twspace_dl = TwspaceDL(twspace, args.output)
+    twspace_dl = TwspaceDL(twspace, args.output, args.threads)
 
     if args.from_dynamic_url:
         twspace_dl.dyn_url = args.from_dynamic_url
@@ -91,8 +101,7 @@ def space(args: argparse.Namespace) -> int:
         twspace_dl.master_url = args.from_master_url
 
     if args.write_metadata:
-        with open(f"{twspace_dl.filename}.json", "w", encoding="utf-8") as metadata_io:
-            json.dump(twspace.source, metadata_io, indent=4)
+        twspace_dl.write_metadata()
     if args.url:
         print(twspace_dl.master_url)
     if args.write_url:
@@ -128,6 +137,14 @@ def main() -> int:
     parser.add_argument("-s", "--skip-download", action="store_true")
     parser.add_argument("-k", "--keep-files", action="store_true")
     parser.add_argument("-l", "--log", action="store_true", help="create logfile")
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=positive_int,
+        default=DEFAULT_THREADS,
+        metavar="THREADS",
+        help=f"number of chunks downloaded concurrently (default: {DEFAULT_THREADS})",
+    )
     parser.add_argument(
         "-c",
         "--input-cookie-file",
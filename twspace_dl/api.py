@@ -25,9 +25,18 @@ RETRY = Retry(
     status_forcelist=(500, 502, 503, 504),
 )
 
+"""The regex pattern to extract the screen name from a Twitter user profile URL."""
+USER_URL_PATTERN = re.compile(r"^(?:https?:\/\/|)twitter\.com\/(?P<screen_name>\w+)$")
+
 """Default connection timeout for making all requests."""
 TIMEOUT = 20
 
+"""Number of hosts to keep connection pools for (Twitter API, media and avatar hosts)."""
+POOL_CONNECTIONS = 4
+
+"""Default maximum number of connections kept alive per host."""
+POOL_MAXSIZE = 10
+
 
 class HTTPClient:
     """The HTTP client for making requests."""
@@ -35,7 +44,27 @@ class HTTPClient:
     def __init__(self) -> None:
         """Initialize the client with a requests session and mount the default retry adapter."""
         self.session = requests.Session()
-        self.session.mount("https://", HTTPAdapter(max_retries=RETRY))
+        self.mount_adapter(POOL_MAXSIZE)
+
+    def mount_adapter(self, pool_maxsize: int) -> None:
+        """Mount the default retry adapter with keep-alive connection pools of the specified size.
+
+        The pool size should be at least the number of threads sharing the session, otherwise the
+        extra connections are closed after each request instead of being reused.
+
+        - pool_maxsize: The maximum number of connections kept alive per host.
+        """
+        replaced_adapter = self.session.adapters.get("https://")
+        self.session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=pool_maxsize,
+                max_retries=RETRY,
+            ),
+        )
+        if replaced_adapter:
+            replaced_adapter.close()
 
     def get(
         self,
@@ -264,9 +293,7 @@ class GraphQLAPI(APIClient):
 
         - raise RuntimeError: If the specified URL is not a valid Twitter user profile URL.
         """
-        if match := re.match(
-            r"^(?:https?:\/\/|)twitter\.com\/(?P<screen_name>\w+)$", user_url.strip("/")
-        ):
+        if match := USER_URL_PATTERN.match(user_url.strip("/")):
             return self.user_id(match.group("screen_name"))
         raise RuntimeError(f"Invalid Twitter user URL: {user_url}")
 
@@ -3,11 +3,26 @@ import json
 import logging
 import os
 import re
+import time
 from collections import defaultdict
 from datetime import datetime
+from typing import Optional
 
 from .api import API
 
+METADATA_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "twspace-dl"
+)
+METADATA_CACHE_EXPIRE = 3600
+
+SPACE_ID_RE = re.compile(r"(?<=spaces/)\w*")
+
+# platform.system docs say it could also return "Windows" or "Java".
+# Failsafe and use Windows sanitisation for Java, as it could be any
+# operating system.
+FILENAME_BLACKLIST = r"\/:*?\"<>|"
+FILENAME_TRANS = str.maketrans({"\0": None, **dict.fromkeys(FILENAME_BLACKLIST, "_")})
+
 
 class Twspace(dict):
     """Downloader class for twitter spaces"""
@@ -59,8 +74,43 @@ class Twspace(dict):
             self["available_for_replay"] = root["is_space_available_for_replay"]
             self["media_key"] = root["media_key"]
 
+    @staticmethod
+    def _cached_metadata(space_id: str) -> Optional[dict]:
+        """Return the cached metadata of an ended space if it hasn't expired"""
+        path = os.path.join(METADATA_CACHE_DIR, f"{space_id}.json")
+        try:
+            if time.time() - os.path.getmtime(path) <= METADATA_CACHE_EXPIRE:
+                with open(path, "r", encoding="utf-8") as metadata_io:
+                    return json.load(metadata_io)
+        except OSError:
+            return None
+        except ValueError:
+            logging.debug("Corrupted metadata cache: %s", path)
+        # drop stale or corrupted entries so the cache doesn't grow forever
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def _cache_metadata(space_id: str, metadata: dict) -> None:
+        """Cache the metadata of an ended space, live ones change over time"""
+        if metadata["data"]["audioSpace"]["metadata"].get("state") != "Ended":
+            return
+        path = os.path.join(METADATA_CACHE_DIR, f"{space_id}.json")
+        try:
+            os.makedirs(METADATA_CACHE_DIR, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as metadata_io:
+                json.dump(metadata, metadata_io)
+        except OSError as err:
+            logging.debug("Can't cache metadata: %s", err)
+
     @staticmethod
     def _metadata(space_id: str) -> dict:
+        if metadata := Twspace._cached_metadata(space_id):
+            logging.debug("Using cached metadata for %s", space_id)
+            return metadata
         metadata = API.graphql_api.audio_space_by_id(space_id)
         try:
             media_key = metadata["data"]["audioSpace"]["metadata"]["media_key"]
@@ -68,6 +118,7 @@ class Twspace(dict):
         except KeyError as error:
             logging.error(metadata)
             raise ValueError("Media Key not available.\nUser is not live") from error
+        Twspace._cache_metadata(space_id, metadata)
         return metadata
 
     # https://gist.github.com/dbr/256270
@@ -80,22 +131,15 @@ class Twspace(dict):
         # Treat extension seperatly
         value, extension = os.path.splitext(value)
 
-        # Remove null byte
-        value = value.replace("\0", "")
+        # Remove null byte and replace every blacklisted character with an
+        # underscore in a single pass
+        value = value.translate(FILENAME_TRANS)
 
         # If the filename starts with a . prepend it with an underscore, so it
         # doesn't become hidden
         if value.startswith("."):
             value = "_" + value
 
-        # platform.system docs say it could also return "Windows" or "Java".
-        # Failsafe and use Windows sanitisation for Java, as it could be any
-        # operating system.
-        blacklist = r"\/:*?\"<>|"
-
-        # Replace every blacklisted character with a underscore
-        value = re.sub("[%s]" % re.escape(blacklist), "_", value)
-
         # Remove any trailing whitespace
         value = value.strip()
 
@@ -140,16 +184,14 @@ class Twspace(dict):
     @classmethod
     def from_space_url(cls, url: str):
         """Create a Twspace instance from a space url"""
-        try:
-            space_id = re.findall(r"(?<=spaces/)\w*", url)[0]
-        except IndexError as err:
+        if not (match := SPACE_ID_RE.search(url)):
             raise ValueError(
                 (
                     "Input URL is not valid.\n"
                     "The URL format should 'https://twitter.com/i/spaces/<space_id>'"
                 )
-            ) from err
-        return cls(cls._metadata(space_id))
+            )
+        return cls(cls._metadata(match.group(0)))
 
     @classmethod
     def from_user_avatar(cls, user_url: str):
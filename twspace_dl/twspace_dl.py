@@ -1,27 +1,65 @@
+import errno
+import json
 import logging
 import os
 import re
 import shutil
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import cached_property
+from typing import List, Optional, Tuple
 from urllib.parse import urlparse
 
 from mutagen.mp4 import MP4, MP4Cover
 
-from .api import API
+from .api import API, POOL_MAXSIZE
 from .twspace import Twspace
 
 DEFAULT_FNAME_FORMAT = "(%(creator_name)s)%(title)s-%(id)s"
 MP4_COVER_FORMAT_MAP = {"jpg": MP4Cover.FORMAT_JPEG, "png": MP4Cover.FORMAT_PNG}
+DEFAULT_THREADS = 8
+CHUNK_URL_RE = re.compile(r"https?://\S+\.aac\S*")
+AUDIO_SPACE_PATH_RE = re.compile(r"(?<=/audio-space/).*")
+MASTER_PLAYLIST_RE = re.compile(r"master_playlist\.m3u8.*")
+FFMPEG_STOP_TIMEOUT = 10
+TEMPORARY_ERROR_HINT = "\nThis might be a temporary error, retry in a few minutes"
+
+
+def stop_ffmpeg(proc: subprocess.Popen) -> None:
+    """Ask ffmpeg to stop so it can finalize its output, kill it if it hangs"""
+    proc.terminate()
+    try:
+        proc.wait(timeout=FFMPEG_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def move_file(src: str, dst: str) -> None:
+    """Move a file, renaming it in place when possible"""
+    if os.path.dirname(dst):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.replace(src, dst)
+    except OSError as err:
+        # the destination directory is on another filesystem
+        if err.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
 
 
 class TwspaceDL:
     """Downloader class for twitter spaces"""
 
-    def __init__(self, space: Twspace, format_str: str) -> None:
+    def __init__(
+        self, space: Twspace, format_str: str, threads: int = DEFAULT_THREADS
+    ) -> None:
         self.space = space
         self.format_str = format_str or DEFAULT_FNAME_FORMAT
+        self.threads = threads
+        if threads > POOL_MAXSIZE:
+            API.client.mount_adapter(threads)
         self._tempdir = ""
 
     @cached_property
@@ -53,12 +91,10 @@ class TwspaceDL:
     @cached_property
     def master_url(self) -> str:
         """Master URL for a space"""
-        master_url = re.sub(
-            r"(?<=/audio-space/).*", "master_playlist.m3u8", self.dyn_url
-        )
+        master_url = AUDIO_SPACE_PATH_RE.sub("master_playlist.m3u8", self.dyn_url)
         return master_url
 
-    @property
+    @cached_property
     def playlist_url(self) -> str:
         """Get the URL containing the chunks filenames"""
         response = API.client.get(self.master_url)
@@ -67,29 +103,80 @@ class TwspaceDL:
         playlist_url = f"https://{domain}{playlist_suffix}"
         return playlist_url
 
-    @property
+    @cached_property
     def playlist_text(self) -> str:
-        """Modify the chunks URL using the master one to be able to download"""
+        """Modify the chunks URL using the master one to be able to download
+
+        The playlist is fetched once, `del self.playlist_text` forces a refresh.
+        """
         playlist_text = API.client.get(self.playlist_url).text
-        master_url_wo_file = re.sub(r"master_playlist\.m3u8.*", "", self.master_url)
-        playlist_text = re.sub(r"(?=chunk)", master_url_wo_file, playlist_text)
+        master_url_wo_file = MASTER_PLAYLIST_RE.sub("", self.master_url)
+        # chunk filenames are always at the start of a line
+        playlist_text = playlist_text.replace(
+            "\nchunk", "\n" + master_url_wo_file + "chunk"
+        )
         return playlist_text
 
-    def write_playlist(self, save_dir: str = "./") -> None:
+    def write_metadata(self) -> None:
+        """Write the full metadata json next to the output file"""
+        path = f"{self.filename}.json"
+        with open(path, "w", encoding="utf-8") as metadata_io:
+            json.dump(self.space.source, metadata_io, indent=4)
+        logging.debug("%(path)s written to disk", dict(path=path))
+
+    def write_playlist(
+        self, save_dir: str = "./", playlist_text: Optional[str] = None
+    ) -> None:
         """Write the modified playlist for external use"""
         filename = os.path.basename(self.filename) + ".m3u8"
         path = os.path.join(save_dir, filename)
         with open(path, "w", encoding="utf-8") as stream_io:
-            stream_io.write(self.playlist_text)
+            stream_io.write(playlist_text or self.playlist_text)
         logging.debug("%(path)s written to disk", dict(path=path))
 
+    @staticmethod
+    def localize_playlist(playlist_text: str) -> Tuple[List[str], List[str], str]:
+        """Return the chunk URLs, their local filenames and the local playlist"""
+        chunk_urls = CHUNK_URL_RE.findall(playlist_text)
+        if not chunk_urls:
+            raise RuntimeError("No chunk found in the playlist")
+        chunk_fns = [f"seg_{index:05d}.aac" for index in range(len(chunk_urls))]
+        local_fns = iter(chunk_fns)
+        local_text = CHUNK_URL_RE.sub(lambda _: next(local_fns), playlist_text)
+        return chunk_urls, chunk_fns, local_text
+
+    def download_chunks(self, save_dir: str, playlist_text: str) -> str:
+        """Download the chunks concurrently, return a playlist pointing to them"""
+        chunk_urls, chunk_fns, local_text = self.localize_playlist(playlist_text)
+
+        def download_chunk(chunk_url: str, chunk_fn: str) -> None:
+            response = API.client.get(chunk_url)
+            with open(os.path.join(save_dir, chunk_fn), "wb") as chunk_io:
+                chunk_io.write(response.content)
+
+        logging.debug("Downloading %d chunks", len(chunk_urls))
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            futures = [
+                executor.submit(download_chunk, chunk_url, chunk_fn)
+                for chunk_url, chunk_fn in zip(chunk_urls, chunk_fns)
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                # don't wait for the queued chunks before reporting the error
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return local_text
+
     def download(self) -> None:
         """Download a twitter space"""
         if not shutil.which("ffmpeg"):
             raise FileNotFoundError("ffmpeg not installed")
         space = self.space
         self._tempdir = tempfile.mkdtemp(dir=".")
-        self.write_playlist(save_dir=self._tempdir)
         state = space["state"]
 
         cmd_base = [
@@ -109,14 +196,19 @@ class TwspaceDL:
             f"episode_id={space['id']}",
         ]
 
-        filename = os.path.basename(self.filename)
+        fname = self.filename
+        filename_final = fname + ".m4a"
+        filename = os.path.basename(fname)
         filename_m3u8 = os.path.join(self._tempdir, filename + ".m3u8")
         filename_old = os.path.join(self._tempdir, filename + ".m4a")
         cmd_old = cmd_base.copy()
         cmd_old.insert(1, "-protocol_whitelist")
-        cmd_old.insert(2, "file,https,httpproxy,tls,tcp")
+        cmd_old.insert(2, "file")
         cmd_old.insert(8, filename_m3u8)
         cmd_old.append(filename_old)
+        if state == "Running":
+            # keep the terminal's progress line for the live part
+            cmd_old[cmd_old.index("-stats")] = "-nostats"
         logging.debug("Command for the old part: %s", " ".join(cmd_old))
 
         if state == "Running":
@@ -141,27 +233,66 @@ class TwspaceDL:
             cmd_final.insert(3, "-safe")
             cmd_final.insert(4, "0")
             cmd_final.insert(10, concat_fn)
-            cmd_final.append(self.filename + ".m4a")
+            cmd_final.append(filename_final)
 
             logging.debug("Command for the new part: %s", " ".join(cmd_new))
             logging.debug("Command for the merge: %s", " ".join(cmd_final))
+            # Take the playlist snapshot before the live recording starts so
+            # that no audio falls between the old and the new part, then
+            # download the old part while the live one is being recorded
+            playlist_text = self.playlist_text
+            # a space that has just started has no old part yet
+            has_old_part = bool(CHUNK_URL_RE.search(playlist_text))
+            proc_new = subprocess.Popen(cmd_new)
             try:
-                subprocess.run(cmd_new, check=True)
-                subprocess.run(cmd_old, check=True)
-                subprocess.run(cmd_final, check=True)
-            except subprocess.CalledProcessError as err:
-                raise RuntimeError(" ".join(err.cmd)) from err
+                try:
+                    retcode_old = 0
+                    if has_old_part:
+                        self.write_playlist(
+                            save_dir=self._tempdir,
+                            playlist_text=self.download_chunks(
+                                self._tempdir, playlist_text
+                            ),
+                        )
+                        # keep the terminal's input for the live part
+                        retcode_old = subprocess.run(
+                            cmd_old, stdin=subprocess.DEVNULL, check=False
+                        ).returncode
+                    else:
+                        logging.info("No old part yet, recording the live part only")
+                except Exception:
+                    # the live part can't be fetched again later, let it finish
+                    logging.error(
+                        "Downloading the old part failed, "
+                        "waiting for the live part to finish"
+                    )
+                    proc_new.wait()
+                    raise
+                retcode_new = proc_new.wait()
+            except KeyboardInterrupt:
+                stop_ffmpeg(proc_new)
+                raise
+            if retcode_old:
+                raise RuntimeError(" ".join(cmd_old) + TEMPORARY_ERROR_HINT)
+            if retcode_new:
+                raise RuntimeError(" ".join(cmd_new))
+            if has_old_part:
+                try:
+                    subprocess.run(cmd_final, check=True)
+                except subprocess.CalledProcessError as err:
+                    raise RuntimeError(" ".join(err.cmd)) from err
+            else:
+                move_file(filename_new, filename_final)
         else:
+            self.write_playlist(
+                save_dir=self._tempdir,
+                playlist_text=self.download_chunks(self._tempdir, self.playlist_text),
+            )
             try:
                 subprocess.run(cmd_old, check=True)
             except subprocess.CalledProcessError as err:
-                raise RuntimeError(
-                    " ".join(err.cmd)
-                    + "\nThis might be a temporary error, retry in a few minutes"
-                ) from err
-            if os.path.dirname(self.filename):
-                os.makedirs(os.path.dirname(self.filename), exist_ok=True)
-            shutil.move(filename_old, self.filename + ".m4a")
+                raise RuntimeError(" ".join(err.cmd) + TEMPORARY_ERROR_HINT) from err
+            move_file(filename_old, filename_final)
 
         logging.info("Finished downloading")
 